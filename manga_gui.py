@@ -1,16 +1,230 @@
 # imports
+import contextlib
+import hashlib
+import io
 import logging
 import os
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from AnyQt.QtWidgets import QButtonGroup
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PIL import Image
+from PyQt5.QtCore import Qt, QObject, QSize, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon, QFont
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QHBoxLayout, \
     QLineEdit, QPushButton, QFileDialog, QGroupBox, QRadioButton, QCheckBox, QProgressBar, \
-    QTextEdit, QMessageBox
+    QPlainTextEdit, QMessageBox, QTreeWidget, QTreeWidgetItem, QListWidget, QListWidgetItem
 
-from manga_pdf_converter import process_volumes, process_chapters, process_hybrid
+from manga_pdf_converter import process_volumes, process_chapters, process_hybrid, \
+    get_folder_groups, get_image_files_recursive
+
+# log view settings - only the newest LOG_MAX_LINES lines are kept on screen,
+# the full log of every conversion is written to a file in LOG_DIR
+LOG_MAX_LINES = 2000
+LOG_FLUSH_INTERVAL_MS = 100
+LOG_DIR = os.path.join(os.path.expanduser("~"), ".manga_pdf_converter", "logs")
+
+# preview settings - thumbnails are made on a small thread pool and kept in THUMBNAIL_DIR,
+# so browsing a library a second time doesn't decode anything
+THUMBNAIL_SIZE = (120, 170)
+THUMBNAIL_WORKERS = min(4, os.cpu_count() or 1)
+THUMBNAIL_DIR = os.path.join(os.path.expanduser("~"), ".manga_pdf_converter", "thumbnails")
+
+
+class LogView(QPlainTextEdit):
+    """
+    read-only log view that can be fed from any thread
+    messages are queued by post() and added in one batch per timer tick,
+    the view keeps at most max_lines lines (older ones drop off the top)
+    and every message is also written to the spill file while one is open
+    """
+
+    def __init__(self, max_lines=LOG_MAX_LINES, flush_interval=LOG_FLUSH_INTERVAL_MS):
+        super().__init__()
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)  # turns the document into a ring buffer
+        self.max_lines = max_lines
+        self.pending = deque()  # deque append/popleft are thread safe
+        self.spill_file = None
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(flush_interval)
+
+    def post(self, message):
+        """queue a message - safe to call from the worker thread"""
+        self.pending.append(str(message))
+
+    def flush(self):
+        """add all queued messages to the view (runs on the GUI thread)"""
+        if not self.pending:
+            return
+
+        lines = []
+        while self.pending:
+            lines.append(self.pending.popleft())
+
+        if self.spill_file:
+            self.spill_file.write("\n".join(lines) + "\n")
+
+        # only follow the output if the user hasn't scrolled up to read something
+        scroll_bar = self.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 2
+
+        # lines that would drop straight off the top aren't worth laying out
+        self.appendPlainText("\n".join(lines[-self.max_lines:]))
+
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def start_spill(self, path):
+        """start writing every message to a log file"""
+        self.stop_spill()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.spill_file = open(path, "w", encoding="utf-8")
+
+    def stop_spill(self):
+        """write out anything still queued and close the log file"""
+        self.flush()
+        if self.spill_file:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def clear(self):
+        self.pending.clear()
+        super().clear()
+
+
+class LineWriter(io.TextIOBase):
+    """
+    file-like object that passes each complete line written to it on to a callback
+    used to route print() output from the converter into the log view
+    """
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+        self.partial = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        lines = (self.partial + text).split("\n")
+        self.partial = lines.pop()  # keep an unfinished line until the rest arrives
+        for line in lines:
+            self.callback(line)
+        return len(text)
+
+    def flush(self):
+        if self.partial:
+            self.callback(self.partial)
+            self.partial = ""
+
+
+def thumbnail_cache_path(image_path, cache_dir=THUMBNAIL_DIR):
+    """
+    path of the cached thumbnail for an image
+    the key is the image's path, modification time and size, so an edited or replaced image gets a new thumbnail
+    """
+    stat = os.stat(image_path)
+    key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, digest[:2], f"{digest}.jpg")
+
+
+def make_thumbnail(image_path, cache_dir=THUMBNAIL_DIR, size=THUMBNAIL_SIZE):
+    """
+    return the path of the image's thumbnail, creating it in the cache if needed
+    runs on the thumbnail thread pool - never on the GUI thread
+    """
+    cache_path = thumbnail_cache_path(image_path, cache_dir)
+    if os.path.exists(cache_path):
+        return cache_path
+
+    with Image.open(image_path) as img:
+        # let the decoder skip the full size image - JPEGs are decoded at 1/2 to 1/8 scale straight away
+        img.draft("RGB", size)
+        thumbnail = img.convert("RGB")
+    thumbnail.thumbnail(size)
+
+    # write under a temporary name first so a half written thumbnail is never picked up
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    thumbnail.save(temp_path, "JPEG", quality=85)
+    os.replace(temp_path, cache_path)
+    return cache_path
+
+
+class ThumbnailLoader(QObject):
+    """
+    creates thumbnails on a background thread pool
+    request() can be called as often as needed - each image is only queued once,
+    and thumbnail_ready is emitted (and delivered on the GUI thread) when it is done
+    """
+    thumbnail_ready = pyqtSignal(str, str)  # image path, thumbnail path ("" if the image couldn't be read)
+
+    def __init__(self, cache_dir=THUMBNAIL_DIR, workers=THUMBNAIL_WORKERS):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = {}  # image path -> future, only touched on the GUI thread
+
+    def request(self, image_path):
+        if image_path in self.pending:
+            return
+        future = self.executor.submit(make_thumbnail, image_path, self.cache_dir)
+        self.pending[image_path] = future
+        future.add_done_callback(lambda done, path=image_path: self._finished(path, done))
+
+    def _finished(self, image_path, future):
+        """runs on the pool thread - the signal hands the result over to the GUI thread"""
+        if future.cancelled():
+            return
+        try:
+            thumbnail_path = future.result()
+        except Exception:
+            thumbnail_path = ""
+        self.thumbnail_ready.emit(image_path, thumbnail_path)
+
+    def done(self, image_path):
+        self.pending.pop(image_path, None)
+
+    def cancel_pending(self):
+        """drop everything that hasn't started yet, e.g. when another group is shown"""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+    def shutdown(self):
+        self.cancel_pending()
+        self.executor.shutdown(wait=False)
+
+
+class PreviewThread(QThread):
+    """
+    works out the folder groups for a mode and lists their images
+    the same grouping the conversion uses, so the preview shows exactly what will be converted
+    """
+    groups_ready = pyqtSignal(object)  # [(group_name, [(folder_path, [image_paths])])]
+    preview_failed = pyqtSignal(str)
+
+    def __init__(self, path, mode):
+        super().__init__()
+        self.path = path
+        self.mode = mode
+
+    def run(self):
+        try:
+            groups = []
+            for group_name, folders in get_folder_groups(self.path, self.mode).items():
+                groups.append((group_name, [(folder, get_image_files_recursive(folder)) for folder in folders]))
+            self.groups_ready.emit(groups)
+        except Exception as e:
+            self.preview_failed.emit(str(e))
 
 
 class WorkerThread(QThread):
@@ -19,14 +233,14 @@ class WorkerThread(QThread):
     this prevents GUI from freezing during long operations
     """
     # define signals
-    progress_update = pyqtSignal(str)  # used for status messages
     finished_signal = pyqtSignal(bool, str)  # for completion (success, message)
 
-    def __init__(self, path, mode, delete_images):
+    def __init__(self, path, mode, delete_images, log):
         super().__init__()
         self.path = path
         self.mode = mode
         self.delete_images = delete_images
+        self.log = log  # thread safe callable for status messages - batched by the log view
         self.is_cancelled = False
 
     def cancel(self):
@@ -38,18 +252,27 @@ class WorkerThread(QThread):
         NEVER UPDATE UI FROM HERE - USE SIGNALS!!!!
         """
         try:
-            self.progress_update.emit(f"Starting conversion in {self.mode.upper()} mode")
-            self.progress_update.emit(f"Source: {self.path}")
-            self.progress_update.emit(f"Delete images: {'Yes' if self.delete_images else 'No'}")
-            self.progress_update.emit("-" * 50)
-
-            # function calls based on mode
-            if self.mode == "volumes":
-                process_volumes(self.path, self.delete_images)
-            elif self.mode == "chapters":
-                process_chapters(self.path, self.delete_images)
-            else:  # hybrid
-                process_hybrid(self.path, self.delete_images)
+            self.log(f"Starting conversion in {self.mode.upper()} mode")
+            self.log(f"Source: {self.path}")
+            self.log(f"Delete images: {'Yes' if self.delete_images else 'No'}")
+            self.log("-" * 50)
+
+            # route the converter's print() output into the log
+            # note: redirect_stdout swaps sys.stdout for the whole process, not just this thread,
+            # so anything printed elsewhere while the worker runs ends up in the log too
+            output = LineWriter(self.log)
+            try:
+                with contextlib.redirect_stdout(output):
+                    # function calls based on mode
+                    if self.mode == "volumes":
+                        process_volumes(self.path, self.delete_images)
+                    elif self.mode == "chapters":
+                        process_chapters(self.path, self.delete_images)
+                    else:  # hybrid
+                        process_hybrid(self.path, self.delete_images)
+            finally:
+                # pass on the last unfinished line, even if the conversion failed
+                output.flush()
 
             if not self.is_cancelled:
                 self.finished_signal.emit(True, "Conversion completed successfully!")
@@ -76,22 +299,45 @@ class MangaConverterGUI(QMainWindow):
         self.process_mode_group = None
         self.selected_path = ""
         self.worker_thread = None
+        self.preview_thread = None
+        self.preview_threads = []  # every scan still running - a QThread must outlive its run()
+        self.group_tree = None
+        self.thumbnail_list = None
+        self.preview_summary_label = None
+        self.thumbnail_items = {}  # image path -> list item of the pages currently shown
+
+        # thumbnails are requested for the visible pages only, once scrolling settles
+        self.thumbnail_loader = ThumbnailLoader()
+        self.thumbnail_loader.thumbnail_ready.connect(self.show_thumbnail)
+        self.visible_thumbnails_timer = QTimer(self)
+        self.visible_thumbnails_timer.setSingleShot(True)
+        self.visible_thumbnails_timer.setInterval(50)
+        self.visible_thumbnails_timer.timeout.connect(self.load_visible_thumbnails)
+
         self.init_ui()
         self.apply_dark_theme()
 
     def init_ui(self):
         # set the window properties
         self.setWindowTitle("Manga PDF converter")
-        self.setGeometry(0, 0, 475, 900)
+        self.setGeometry(0, 0, 1000, 900)
 
         # create central widget
         central_widget = QWidget()
         central_widget.setObjectName("centralWidget")
         self.setCentralWidget(central_widget)
 
+        # settings and log on the left, preview on the right
+        window_layout = QHBoxLayout()
+        central_widget.setLayout(window_layout)
+
         # create main layout
         main_layout = QVBoxLayout()
-        central_widget.setLayout(main_layout)
+        window_layout.addLayout(main_layout)
+
+        # preview section
+        preview_section = self.create_preview_section()
+        window_layout.addWidget(preview_section, 1)
 
         # title label
         title = QLabel("manga to PDF converter")
@@ -206,7 +452,7 @@ class MangaConverterGUI(QMainWindow):
                 color: #ffffff;
                 font-size: 12px;
             }
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1e1e1e;
                 border: 2px solid #555555;
                 border-radius: 4px;
@@ -214,6 +460,13 @@ class MangaConverterGUI(QMainWindow):
                 font-family: 'Consolas', 'Monaco', monospace;
                 font-size: 11px;
             }
+            QTreeWidget, QListWidget {
+                background-color: #1e1e1e;
+                border: 2px solid #555555;
+                border-radius: 4px;
+                color: #ffffff;
+                font-size: 11px;
+            }
             QRadioButton {
                 color: #ffffff;
                 spacing: 8px;
@@ -334,6 +587,9 @@ class MangaConverterGUI(QMainWindow):
 
         mode_selection_section_layout.addWidget(mode_desc_label)
 
+        # the preview follows the selected mode
+        self.process_mode_group.buttonClicked.connect(self.refresh_preview)
+
         return mode_selection_section
 
     def create_options_section(self):
@@ -383,11 +639,10 @@ class MangaConverterGUI(QMainWindow):
         self.progress_bar.setVisible(False)  # hide progress bar initially
         progress_group_layout.addWidget(self.progress_bar)
 
-        # logging area
-        self.log_text_area = QTextEdit()
+        # logging area - batched and bounded, so long runs don't freeze the UI
+        self.log_text_area = LogView()
         self.log_text_area.setMaximumHeight(250)
         self.log_text_area.setFont(QFont("Consolas", 9))
-        self.log_text_area.setReadOnly(True)
         progress_group_layout.addWidget(self.log_text_area)
 
         # clear log button
@@ -403,6 +658,143 @@ class MangaConverterGUI(QMainWindow):
 
         return progress_group_box
 
+    def create_preview_section(self):
+        preview_group_box = QGroupBox("preview")
+        preview_group_layout = QVBoxLayout()
+        preview_group_box.setLayout(preview_group_layout)
+
+        # summary of the groups and refresh button
+        summary_layout = QHBoxLayout()
+        self.preview_summary_label = QLabel("select a folder to preview how it will be grouped")
+        self.preview_summary_label.setStyleSheet("background-color: #353535; font-size: 12px;")
+        summary_layout.addWidget(self.preview_summary_label, 1)
+
+        refresh_btn = QPushButton("refresh")
+        refresh_btn.clicked.connect(self.refresh_preview)
+        summary_layout.addWidget(refresh_btn)
+        preview_group_layout.addLayout(summary_layout)
+
+        # one entry per pdf, with the folders that go into it underneath
+        self.group_tree = QTreeWidget()
+        self.group_tree.setHeaderLabels(["pdf / folder", "pages"])
+        self.group_tree.setColumnWidth(0, 380)
+        self.group_tree.currentItemChanged.connect(self.show_group_pages)
+        preview_group_layout.addWidget(self.group_tree, 1)
+
+        # thumbnails of the selected group or folder
+        self.thumbnail_list = QListWidget()
+        self.thumbnail_list.setViewMode(QListWidget.IconMode)
+        self.thumbnail_list.setIconSize(QSize(*THUMBNAIL_SIZE))
+        # a fixed grid keeps the layout stable while thumbnails arrive, so only visible pages get loaded
+        self.thumbnail_list.setGridSize(QSize(THUMBNAIL_SIZE[0] + 20, THUMBNAIL_SIZE[1] + 40))
+        self.thumbnail_list.setResizeMode(QListWidget.Adjust)
+        self.thumbnail_list.setMovement(QListWidget.Static)
+        self.thumbnail_list.setUniformItemSizes(True)
+        self.thumbnail_list.setWordWrap(True)
+        self.thumbnail_list.verticalScrollBar().valueChanged.connect(self.schedule_visible_thumbnails)
+        preview_group_layout.addWidget(self.thumbnail_list, 2)
+
+        return preview_group_box
+
+    def refresh_preview(self):
+        """
+        work out the groups for the selected folder and mode on a background thread
+        """
+        if not self.selected_path or not os.path.isdir(self.selected_path):
+            return
+        self.preview_threads = [thread for thread in self.preview_threads if thread.isRunning()]
+
+        # only the newest scan is shown, older ones are left to finish in the background
+        self.preview_summary_label.setText("reading folders...")
+        self.preview_thread = PreviewThread(self.selected_path, self.get_selected_mode())
+        self.preview_thread.groups_ready.connect(self.show_preview_groups)
+        self.preview_thread.preview_failed.connect(self.preview_failed)
+        self.preview_threads.append(self.preview_thread)
+        self.preview_thread.start()
+
+    def show_preview_groups(self, groups):
+        """fill the group list with the result of the preview thread"""
+        if self.sender() is not self.preview_thread:
+            return  # an older scan finishing late
+        self.group_tree.clear()
+        self.clear_thumbnails()
+
+        total_pages = 0
+        for group_name, folders in groups:
+            group_images = [path for _, images in folders for path in images]
+            total_pages += len(group_images)
+
+            group_item = QTreeWidgetItem([f"{group_name}.pdf", str(len(group_images))])
+            group_item.setData(0, Qt.UserRole, group_images)
+            for folder, images in folders:
+                folder_item = QTreeWidgetItem([os.path.basename(folder), str(len(images))])
+                folder_item.setData(0, Qt.UserRole, images)
+                group_item.addChild(folder_item)
+            self.group_tree.addTopLevelItem(group_item)
+
+        self.preview_summary_label.setText(f"{len(groups)} pdfs, {total_pages} pages")
+
+    def preview_failed(self, message):
+        if self.sender() is not self.preview_thread:
+            return
+        self.group_tree.clear()
+        self.clear_thumbnails()
+        self.preview_summary_label.setText(f"preview failed: {message}")
+
+    def clear_thumbnails(self):
+        self.thumbnail_loader.cancel_pending()
+        self.thumbnail_list.clear()
+        self.thumbnail_items = {}
+
+    def show_group_pages(self, item, _previous=None):
+        """show the pages of the selected group or folder - thumbnails follow as they become visible"""
+        self.clear_thumbnails()
+        if item is None:
+            return
+
+        for image_path in item.data(0, Qt.UserRole):
+            page_item = QListWidgetItem(os.path.basename(image_path))
+            page_item.setData(Qt.UserRole, image_path)
+            page_item.setToolTip(image_path)
+            self.thumbnail_list.addItem(page_item)
+            self.thumbnail_items[image_path] = page_item
+
+        self.schedule_visible_thumbnails()
+
+    def schedule_visible_thumbnails(self):
+        """load the visible thumbnails once scrolling or resizing settles"""
+        self.visible_thumbnails_timer.start()
+
+    def load_visible_thumbnails(self):
+        """
+        request thumbnails for the pages on screen plus one screen ahead
+        """
+        view_rect = self.thumbnail_list.viewport().rect()
+        view_rect.setBottom(view_rect.bottom() + view_rect.height())
+
+        for row in range(self.thumbnail_list.count()):
+            item = self.thumbnail_list.item(row)
+            if item.icon().isNull() and self.thumbnail_list.visualItemRect(item).intersects(view_rect):
+                self.thumbnail_loader.request(item.data(Qt.UserRole))
+
+    def show_thumbnail(self, image_path, thumbnail_path):
+        """runs on the GUI thread when a thumbnail is ready"""
+        self.thumbnail_loader.done(image_path)
+        item = self.thumbnail_items.get(image_path)
+        if item is not None and thumbnail_path:
+            item.setIcon(QIcon(thumbnail_path))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.thumbnail_list is not None:
+            self.schedule_visible_thumbnails()
+
+    def closeEvent(self, event):
+        self.thumbnail_loader.shutdown()
+        for thread in self.preview_threads:
+            thread.wait()
+        super().closeEvent(event)
+
     def clear_log(self):
         """Clear the log text area"""
         self.log_text_area.clear()
@@ -454,23 +846,28 @@ class MangaConverterGUI(QMainWindow):
         self.status_label.setStyleSheet("color: orange; font-weight: bold; font-size: 14px;")
 
         self.log_text_area.clear()
-        self.log_text_area.append(f'starting conversion in {process_mode} mode')
+
+        # keep the full log on disk - the view only holds the newest lines
+        log_path = os.path.join(LOG_DIR, f"conversion-{time.strftime('%Y%m%d-%H%M%S')}.log")
+        try:
+            self.log_text_area.start_spill(log_path)
+            self.update_progress(f"full log: {log_path}")
+        except OSError as e:
+            self.update_progress(f"could not create log file {log_path}: {e}")
+        self.update_progress(f'starting conversion in {process_mode} mode')
 
         # create and start the worker thread
-        self.worker_thread = WorkerThread(self.selected_path, process_mode, delete_images)
-        self.worker_thread.progress_update.connect(self.update_progress)
+        self.worker_thread = WorkerThread(self.selected_path, process_mode, delete_images, self.update_progress)
         self.worker_thread.finished_signal.connect(self.conversion_finished)
         self.worker_thread.start()
 
     def update_progress(self, message):
         """
         update the progress display
-        called from the worker thread
+        safe to call from the worker thread - messages are shown in batches by the log view
         :param message:
         """
-        self.log_text_area.append(message)
-        # auto scroll to bottom
-        self.log_text_area.verticalScrollBar().setValue(self.log_text_area.verticalScrollBar().maximum())
+        self.log_text_area.post(message)
 
     def conversion_finished(self, success, message):
         """
@@ -482,13 +879,13 @@ class MangaConverterGUI(QMainWindow):
         self.progress_bar.setVisible(False)
 
         # show the result
+        self.update_progress(message)
+        self.log_text_area.stop_spill()
         if success:
-            self.log_text_area.append(f"{message}")
             self.status_label.setText("conversion completed successfully :)")
             self.status_label.setStyleSheet("color: green; font-weight: bold; font-size: 14px;")
             QMessageBox.information(self, "conversion successful :)", message)
         else:
-            self.log_text_area.append(f"{message}")
             self.status_label.setText("Conversion failed")
             self.status_label.setStyleSheet("color: red; font-weight: bold; font-size: 14px;")
             QMessageBox.critical(self, "conversion failed", message)
@@ -519,7 +916,8 @@ class MangaConverterGUI(QMainWindow):
         if folder:  # if user doesnt cancel
             self.selected_path = folder
             self.path_input.setText(folder)
-            self.log_text_area.append(f"Selected folder: {folder}")
+            self.update_progress(f"Selected folder: {folder}")
+            self.refresh_preview()
 
 
 if __name__ == "__main__":
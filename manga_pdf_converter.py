@@ -1,13 +1,90 @@
+import csv
+import io
+import json
+import multiprocessing
 import os
 import re
-from collections import defaultdict
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import warnings
+import zlib
+from collections import Counter, defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 import argparse
-from PIL import Image
+from PIL import Image, ImageChops
 import sys
 
+# watchdog is optional - without it, watch mode falls back to polling the folders
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+# resource only exists on Unix - without it, isolated groups run without a memory limit
+try:
+    import resource
+except ImportError:
+    resource = None
+
 OUTPUT_DIR_NAME = "PDF"
 
+# Rejected images are moved here (inside the output directory) when quarantine is enabled
+QUARANTINE_DIR_NAME = "_quarantine"
+
+# Number of file reads kept in flight at once (header probes, folder listing and page read-ahead).
+# Raise it on network filesystems, where every read waits a full round trip
+IO_WORKERS = 8
+
+# Upper limit for page file bytes read ahead but not yet handed to a decoder
+READ_AHEAD_BYTES = 64 * 1024 * 1024
+
+# Number of threads decoding and encoding pages (Pillow releases the GIL while doing this)
+DECODE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Encoder profiles (see encode_page) and the quality used whenever a page is re-encoded as JPEG
+ENCODER_PROFILES = ("jpeg", "fast", "balanced", "small")
+JPEG_QUALITY = 75
+
+# Page statistics used to pick an encoder (see analyse_page)
+GRAYSCALE_TOLERANCE = 12  # largest colour difference still treated as gray
+BILEVEL_MARGIN = 32  # gray levels this close to black or white count as black or white
+BILEVEL_RATIO = 0.98  # share of pixels that must be black or white for a 1-bit page
+FLAT_COLOURS = 64  # most distinct colours in a flat colour page
+
+# Failed groups (errors, timeouts, crashed workers) are retried this many times
+GROUP_RETRIES = 1
+
+# PDFs are written under this suffix and renamed once complete, so a failed run never leaves a broken PDF
+PARTIAL_SUFFIX = ".part"
+
+# Watch mode: how long a folder must stay unchanged before it is converted,
+# and how often pending folders are checked (and polled, without watchdog)
+WATCH_SETTLE_SECONDS = 10
+WATCH_POLL_INTERVAL = 2
+# Without watchdog, a poll only walks the top-level folders whose mtime changed (or that are still settling).
+# The whole library is walked this often too, for pages added to nested folders (which leave that mtime alone)
+WATCH_RESCAN_INTERVAL = 300
+# How long watchdog may take to deliver an event (its inotify backend holds events back for up to 0.5s)
+WATCH_EVENT_DELAY = 1
+
+# Header information for a single page, filled in by probe_image()
+# error is None for a usable page, otherwise the reason the page was rejected.
+# read_error is set when the file could not be read (rather than being broken), so it is never quarantined
+PageInfo = namedtuple("PageInfo", "path file_size width height mode format progressive error read_error",
+                      defaults=(False,))
+
+# A page image encoded for the PDF: the stream data and the image dictionary entries that go with it.
+# encoder names the choice that was made, for the run report
+EncodedImage = namedtuple("EncodedImage", "data size colorspace filter bits decode_parms encoder")
+
+# Where an image goes on one PDF page: the page box size in points and the placement matrix
+Placement = namedtuple("Placement", "width height matrix")
+
 
 def get_all_retrace_folders(root):
     """
@@ -84,6 +161,25 @@ def get_hybrid_groups(root):
     return hybrid_groups
 
 
+def get_folder_groups(root, mode):
+    """
+    Returns the folder groups for a processing mode, in the {"group_name": [folder_paths]}
+    format used by process_folder_groups.
+    """
+    if mode == "volumes":
+        return get_all_retrace_folders(root)
+    elif mode == "chapters":
+        return {folder_name: [folder_path] for folder_name, folder_path in get_all_chapter_folders(root)}
+    else:
+        return get_hybrid_groups(root)
+
+
+def get_output_dir(root):
+    """Returns the PDF output directory for a manga root: <parent>/PDF/<manga name>"""
+    manga_name = os.path.basename(os.path.abspath(root))
+    return os.path.join(os.path.dirname(root), OUTPUT_DIR_NAME, manga_name)
+
+
 def get_image_files_recursive(folder):
     """
     Recursively searches through a folder and finds all image files.
@@ -170,75 +266,1218 @@ def cleanup_empty_directories_recursive(root_path):
     return removed_root
 
 
-def convert_images_to_pdf(image_paths, output_path, delete_images=False):
+def _has_end_marker(path, image_format):
     """
-    Takes a list of image file paths and converts them into a single PDF file.
+    Checks PNG and JPEG files for their end marker.
+    A missing marker almost always means the file was truncated (e.g. an interrupted download).
+    Other formats have no reliable trailer, so they always pass.
+    """
+    if image_format == "PNG":
+        marker = b"IEND"
+    elif image_format == "JPEG":
+        marker = b"\xff\xd9"
+    else:
+        return True
+
+    with open(path, "rb") as f:
+        # Usually the marker is in the last few bytes, so only the tail is read
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 1024))
+        if marker in f.read():
+            return True
+
+        # Metadata or padding can be appended after the marker - scan the whole file before giving up.
+        # A truncated file that still contains the bytes somewhere (e.g. the end of an embedded
+        # thumbnail) gets through here, and is caught when the page is decoded or verified
+        f.seek(0)
+        tail = b""
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                return False
+            if marker in tail + chunk:
+                return True
+            tail = chunk[-(len(marker) - 1):]
+
+
+def is_read_error(error):
+    """
+    True for errors reading a file (I/O errors, permissions, a flaky network share) as opposed to
+    broken image data - Pillow reports bad data as OSError too, but without an errno
+    """
+    return isinstance(error, OSError) and error.errno is not None
+
+
+def probe_image(path):
+    """
+    Reads only the header of an image file, without decoding any pixels.
+    Returns a PageInfo with the dimensions, mode, format and progressive flag,
+    or a PageInfo with error set if the file is empty, truncated or unreadable.
+    Running out of memory is not a problem with the file, so MemoryError is raised.
+    """
+    try:
+        file_size = os.path.getsize(path)
+        if file_size == 0:
+            return PageInfo(path, 0, 0, 0, None, None, False, "empty file")
+
+        # Image.open is lazy - it parses the header and leaves the pixel data on disk
+        with Image.open(path) as img:
+            width, height = img.size
+            mode = img.mode
+            image_format = img.format
+            # JPEG reports 'progressive'/'progression', PNG and GIF report 'interlace'
+            progressive = bool(img.info.get("progressive") or img.info.get("progression")
+                               or img.info.get("interlace"))
+
+        if width <= 0 or height <= 0:
+            return PageInfo(path, file_size, width, height, mode, image_format, progressive, "invalid dimensions")
+
+        if not _has_end_marker(path, image_format):
+            return PageInfo(path, file_size, width, height, mode, image_format, progressive, "file is truncated")
+
+        return PageInfo(path, file_size, width, height, mode, image_format, progressive, None)
+    except MemoryError:
+        raise
+    except Exception as e:
+        # Unidentified formats, unreadable files and decompression bombs all end up here
+        return PageInfo(path, 0, 0, 0, None, None, False, str(e), is_read_error(e))
+
+
+def probe_images(image_paths, workers=IO_WORKERS):
+    """
+    Probes the headers of all images in parallel.
+    Returns a list of PageInfo in the same order as image_paths.
     """
-    # If no images provided, skip conversion
     if not image_paths:
-        print(f"No images to convert for {output_path}")
+        return []
+
+    # Header reads are I/O bound, so threads overlap the waiting nicely
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(probe_image, image_paths))
+
+
+def quarantine_image_files(image_paths, quarantine_dir):
+    """
+    Moves rejected image files into the quarantine directory so they can be inspected later.
+    The parent folder name is kept in the new file name, since chapters often reuse names like 001.jpg
+    """
+    os.makedirs(quarantine_dir, exist_ok=True)
+
+    for image_path in image_paths:
+        parent = os.path.basename(os.path.dirname(image_path))
+        target = os.path.join(quarantine_dir, f"{parent}_{os.path.basename(image_path)}")
+
+        # Never overwrite something that is already in quarantine
+        base, ext = os.path.splitext(target)
+        counter = 1
+        while os.path.exists(target):
+            target = f"{base}_{counter}{ext}"
+            counter += 1
+
+        try:
+            shutil.move(image_path, target)
+            print(f"Quarantined {image_path} -> {target}")
+        except OSError as e:
+            print(f"Warning: could not quarantine {image_path}: {e}")
+
+
+def is_spread(width, height):
+    """A page wider than it is tall is treated as a double-page spread"""
+    return width > height
+
+
+def get_target_page_size(pages):
+    """
+    Picks the page box used when normalising: the most common single-page size in the group.
+    Falls back to the first page if the group only contains spreads.
+    """
+    singles = Counter((page.width, page.height) for page in pages if not is_spread(page.width, page.height))
+    if singles:
+        return singles.most_common(1)[0][0]
+    return pages[0].width / 2, pages[0].height
+
+
+def layout_page(width, height, page_size="original", target_size=None, split_spreads=False, direction="rtl"):
+    """
+    Works out where an image of width x height pixels goes in the PDF, without touching its pixels.
+    Returns a list of Placements - one per PDF page, or two when a spread is split.
+    Each matrix maps the unit square of the image XObject onto the page (as used by the 'cm' operator).
+    page_size: "original" keeps 1 pixel = 1 point, "normalize" fits every page into target_size
+    (spreads get a box twice as wide) and centres it.
+    direction: "rtl" puts the right half of a split spread first, as manga is read.
+    """
+    spread = is_spread(width, height)
+
+    if page_size == "normalize":
+        box_width, box_height = target_size
+        if spread:
+            box_width *= 2
+        # Scale to fit the box while keeping the aspect ratio, then centre the image
+        scale = min(box_width / width, box_height / height)
+        draw_width, draw_height = width * scale, height * scale
+        offset_x, offset_y = (box_width - draw_width) / 2, (box_height - draw_height) / 2
+    else:
+        box_width, box_height = width, height
+        draw_width, draw_height = width, height
+        offset_x = offset_y = 0
+
+    if not (spread and split_spreads):
+        return [Placement(box_width, box_height, (draw_width, 0, 0, draw_height, offset_x, offset_y))]
+
+    # Both halves draw the whole image - each page box just shows one side of it
+    half = box_width / 2
+    left = Placement(half, box_height, (draw_width, 0, 0, draw_height, offset_x, offset_y))
+    right = Placement(half, box_height, (draw_width, 0, 0, draw_height, offset_x - half, offset_y))
+    return [right, left] if direction == "rtl" else [left, right]
+
+
+def _format_number(value):
+    """Formats a PDF number, dropping pointless decimals"""
+    return f"{value:.4f}".rstrip("0").rstrip(".") if isinstance(value, float) else str(value)
+
+
+def _format_text(text):
+    """Formats a PDF text string - a literal string for ASCII, UTF-16 with a byte order mark for anything else"""
+    if text.isascii():
+        escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        return f"({escaped})"
+    return f"<{(chr(0xFEFF) + text).encode('utf-16-be').hex().upper()}>"
+
+
+class PdfWriter:
+    """
+    Minimal streaming PDF writer.
+    The layout of every page is known up front (from the image headers), so the page tree can be
+    referenced before anything is decoded. Images are then written one at a time and their pixels
+    released straight away, instead of holding the whole volume in memory.
+    A split spread is written as one image XObject shared by two pages.
+
+    With chapters, a merged volume gets one bookmark per chapter and page labels that restart at
+    every chapter. Bookmarks are recorded as pages are written (so chapters whose pages all failed
+    to decode are left out) and the outline is written by close().
+
+    With linearize=True the file is laid out for fast web view: the first page comes right after a
+    small first-page cross-reference table, followed by the hint stream, so a reader streaming the
+    file can show page 1 after the first few hundred KB. The parts that depend on the rest of the file
+    (file length, offsets, hint tables) are written as fixed-size placeholders and filled in by close(),
+    so the file is never rewritten. The image of a split spread belongs to two pages, so it is a shared
+    object: it is spooled to a temporary file and written after the last page, as the format expects.
+    """
+    # Bits used for the entries of the hint tables (fixed, so the size is known up front)
+    HINT_OBJECTS_BITS = 16
+    HINT_OFFSET_BITS = 32
+    HINT_SHARED_COUNT_BITS = 8
+    HINT_SHARED_ID_BITS = 16
+    HINT_HEADER_SIZE = 36
+    HINT_SHARED_HEADER_SIZE = 24
+    HINT_OUTLINE_TABLE_SIZE = 16
+    FIRST_PAGE_OBJECTS = 3  # the first page, its contents and its image
+
+    def __init__(self, output_path, layouts, linearize=False, chapters=None):
+        """
+        layouts: one list of Placements per image, as returned by layout_page()
+        chapters: list of (title, index of the chapter's first image), in image order
+        """
+        self.output_path = output_path
+        self.partial_path = output_path + PARTIAL_SUFFIX
+        self.layouts = layouts
+        self.linearize = linearize
+        self.offsets = {}  # object id -> byte offset in the file
+        self.ends = {}  # object id -> byte offset just past the object
+        self.page_ids = []  # ids of the pages actually written, in order
+        # (start, end, object count, contents offset, contents length, shared object indexes) per page
+        self.page_sections = []
+        self.spool = None  # temporary file holding the shared images of a linearized file
+        self.spooled_images = []  # (image id, image dictionary, spool offset, length)
+        self.next_free = {}  # free object id -> next free object id, filled in by close()
+        self.next_id = 1
+
+        if linearize:
+            # Object numbers are handed out once the first page arrives (see _start_linearized_file)
+            self.pages_id = None
+        else:
+            self.pages_id = self._reserve()
+            self.catalog_id = self._reserve()
+
+        # Outline root, one item per chapter and the page labels - ids reserved now, as the catalog
+        # of a linearized file is written before any page
+        self.chapters = chapters or []
+        self.image_chapters = []  # chapter number of every image
+        for number, (_, first_image) in enumerate(self.chapters):
+            next_first_image = self.chapters[number + 1][1] if number + 1 < len(self.chapters) else len(layouts)
+            self.image_chapters.extend([number] * (next_first_image - first_image))
+        self.bookmarks = []  # (chapter number, index of its first written page)
+        if self.chapters:
+            self.outline_ids = [self._reserve() for _ in range(len(self.chapters) + 1)]
+            self.page_labels_id = self._reserve()
+
+        self.fp = open(self.partial_path, "wb")
+        self.fp.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    @property
+    def page_count(self):
+        return len(self.page_ids)
+
+    def _reserve(self):
+        """Hands out the next object id"""
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, body, stream=None):
+        """Writes one indirect object, optionally followed by a stream. Returns the offset of the stream data"""
+        self.offsets[obj_id] = self.fp.tell()
+        self.fp.write(f"{obj_id} 0 obj\n".encode())
+        stream_offset = None
+        if stream is None:
+            self.fp.write(body.encode() + b"\n")
+        else:
+            self.fp.write(body.encode() + b"\nstream\n")
+            stream_offset = self.fp.tell()
+            self.fp.write(stream)
+            self.fp.write(b"\nendstream\n")
+        self.fp.write(b"endobj\n")
+        self.ends[obj_id] = self.fp.tell()
+        return stream_offset
+
+    def _start_linearized_file(self, index):
+        """
+        Numbers the objects once the first page (image number index) is known, then writes the
+        placeholders for the linearization dictionary and first-page xref, and the catalog.
+        A linearized file numbers its first-page section after every other object, so the remaining
+        pages get the low ids (in writing order, with the shared images of split spreads at the top of
+        the range so the shared objects section is numbered consecutively), then the page tree, then
+        the first-page section.
+        """
+        # The second half of a split first page is not part of the first-page section
+        remaining_objects = 2 * (len(self.layouts[index]) - 1)
+        remaining_objects += sum(1 + 2 * len(placements) for placements in self.layouts[index + 1:])
+        shared_images = sum(1 for placements in self.layouts[index + 1:] if len(placements) > 1)
+        self.pages_id = self.next_id + remaining_objects
+        self.shared_start = self.next_shared_id = self.pages_id - shared_images
+        self.catalog_id = self.pages_id + 1
+        self.linearization_id = self.catalog_id + 1
+        self.hint_id = self.linearization_id + 1
+        self.first_page_ids = list(range(self.hint_id + 1, self.hint_id + 1 + self.FIRST_PAGE_OBJECTS))
+        self.size = self.first_page_ids[-1] + 1
+
+        self.offsets[self.linearization_id] = self.fp.tell()
+        self.fp.write(self._linearization_object(0, 0, 0, 0, 0, 0))
+        self.first_xref_offset = self.fp.tell()
+        self.fp.write(self._first_page_xref(0))
+        self._write_object(self.catalog_id, self._catalog())
+
+    def _catalog(self):
+        """The document catalog, pointing to the outline and page labels of a merged volume"""
+        entries = f"/Type /Catalog /Pages {self.pages_id} 0 R"
+        if self.chapters:
+            entries += f" /Outlines {self.outline_ids[0]} 0 R /PageLabels {self.page_labels_id} 0 R"
+        return f"<< {entries} >>"
+
+    def _write_outline(self):
+        """
+        Writes one bookmark per chapter that made it into the file, and page labels
+        numbering the pages of every chapter from 1, e.g. "Vol.1 Ch2: 5"
+        """
+        root_id = self.outline_ids[0]
+        item_ids = [self.outline_ids[number + 1] for number, _ in self.bookmarks]
+        self._write_object(root_id, f"<< /Type /Outlines /First {item_ids[0]} 0 R /Last {item_ids[-1]} 0 R "
+                                    f"/Count {len(item_ids)} >>")
+        for position, (number, first_page) in enumerate(self.bookmarks):
+            title = self.chapters[number][0]
+            links = ""
+            if position > 0:
+                links += f" /Prev {item_ids[position - 1]} 0 R"
+            if position + 1 < len(item_ids):
+                links += f" /Next {item_ids[position + 1]} 0 R"
+            self._write_object(
+                item_ids[position],
+                f"<< /Title {_format_text(title)} /Parent {root_id} 0 R /Dest [{self.page_ids[first_page]} 0 R /Fit]"
+                f"{links} >>",
+            )
+        self.outline_end = self.fp.tell()
+
+        labels = " ".join(f"{first_page} << /S /D /P {_format_text(self.chapters[number][0] + ': ')} >>"
+                          for number, first_page in self.bookmarks)
+        self._write_object(self.page_labels_id, f"<< /Nums [{labels}] >>")
+
+    def _linearization_object(self, file_length, hint_offset, hint_length, first_page_end, page_count, main_xref_entry):
+        """The linearization parameter dictionary - fixed width numbers, so it can be patched in place"""
+        return (f"{self.linearization_id} 0 obj\n<< /Linearized 1 /L {file_length:010d} "
+                f"/H [{hint_offset:010d} {hint_length:010d}] /O {self.first_page_ids[0]} "
+                f"/E {first_page_end:010d} /N {page_count:010d} /T {main_xref_entry:010d} >>\nendobj\n").encode()
+
+    def _first_page_xref(self, main_xref_offset):
+        """The first-page cross-reference table and trailer, covering the ids from the catalog up"""
+        lines = [f"xref\n{self.catalog_id} {self.size - self.catalog_id}\n"]
+        for obj_id in range(self.catalog_id, self.size):
+            lines.append(self._xref_entry(obj_id))
+        lines.append(f"trailer\n<< /Size {self.size} /Root {self.catalog_id} 0 R /Prev {main_xref_offset:010d} >>\n"
+                     f"startxref\n0\n%%EOF\n")
+        return "".join(lines).encode()
+
+    def _xref_entry(self, obj_id):
+        """One 20 byte cross-reference entry - ids of pages that failed to decode are listed as free objects"""
+        if obj_id in self.offsets:
+            return f"{self.offsets[obj_id]:010d} 00000 n \n"
+        return f"{self.next_free.get(obj_id, 0):010d} 65535 f \n"
+
+    def _hint_page_table_size(self):
+        """Size of the page offset hint table - one fixed-size entry per planned page, with room for one shared image"""
+        planned_pages = sum(len(placements) for placements in self.layouts)
+        per_page = (self.HINT_OBJECTS_BITS + 3 * self.HINT_OFFSET_BITS
+                    + self.HINT_SHARED_COUNT_BITS + self.HINT_SHARED_ID_BITS) // 8
+        return self.HINT_HEADER_SIZE + per_page * planned_pages
+
+    def _hint_shared_table_size(self):
+        """Size of the shared object hint table - the first page's objects, then at most one image per spread"""
+        entries = self.FIRST_PAGE_OBJECTS + sum(1 for placements in self.layouts if len(placements) > 1)
+        return self.HINT_SHARED_HEADER_SIZE + entries * self.HINT_OFFSET_BITS // 8 + (entries + 7) // 8
+
+    def _hint_tables_size(self):
+        """Size of the whole hint stream - the page and shared object tables, plus the outline table if there is one"""
+        size = self._hint_page_table_size() + self._hint_shared_table_size()
+        return size + (self.HINT_OUTLINE_TABLE_SIZE if self.chapters else 0)
+
+    def _shared_object_index(self, obj_id):
+        """Position of an object in the shared object hint table: the first page's objects, then the spooled images"""
+        if obj_id in self.first_page_ids:
+            return self.first_page_ids.index(obj_id)
+        return len(self.first_page_ids) + obj_id - self.shared_start
+
+    def _hint_stream_data(self):
+        """
+        Builds the page offset and shared object hint tables (PDF reference, Annex F).
+        Offsets are given as if the hint stream were not in the file, as the format requires.
+        """
+        def adjust(offset):
+            return offset - self.hint_length if offset > self.hint_offset else offset
+
+        sections = self.page_sections
+        least_objects = min(section[2] for section in sections)
+        least_length = min(section[1] - section[0] for section in sections)
+        least_contents_offset = min(section[3] for section in sections)
+        least_contents_length = min(section[4] for section in sections)
+
+        header = struct.pack(
+            ">IIHIHIHIHHHHH",
+            least_objects, adjust(sections[0][0]), self.HINT_OBJECTS_BITS,
+            least_length, self.HINT_OFFSET_BITS,
+            least_contents_offset, self.HINT_OFFSET_BITS,
+            least_contents_length, self.HINT_OFFSET_BITS,
+            self.HINT_SHARED_COUNT_BITS, self.HINT_SHARED_ID_BITS,
+            0, 1,  # shared objects are never split across positions
+        )
+        # Each item is listed for every page in turn
+        entries = b"".join(struct.pack(">H", section[2] - least_objects) for section in sections)
+        entries += b"".join(struct.pack(">I", section[1] - section[0] - least_length) for section in sections)
+        entries += b"".join(struct.pack(">B", len(section[5])) for section in sections)
+        entries += b"".join(struct.pack(">H", shared_index) for section in sections for shared_index in section[5])
+        entries += b"".join(struct.pack(">I", section[3] - least_contents_offset) for section in sections)
+        entries += b"".join(struct.pack(">I", section[4] - least_contents_length) for section in sections)
+        page_table = (header + entries).ljust(self._hint_page_table_size(), b"\0")
+
+        # Shared object hint table: the first page's objects, then the shared objects section
+        # (the images of split spreads), one object per group
+        shared_ids = list(range(self.shared_start, self.next_shared_id))
+        group_ids = self.first_page_ids + shared_ids
+        group_lengths = [self.ends[obj_id] - self.offsets[obj_id] for obj_id in group_ids]
+        least_group_length = min(group_lengths)
+        shared_table = struct.pack(
+            ">IIIIHIH",
+            shared_ids[0] if shared_ids else 0, adjust(self.offsets[shared_ids[0]]) if shared_ids else 0,
+            len(self.first_page_ids), len(group_ids), 0, least_group_length, self.HINT_OFFSET_BITS,
+        )
+        shared_table += b"".join(struct.pack(">I", length - least_group_length) for length in group_lengths)
+        shared_table += bytes((len(group_ids) + 7) // 8)  # no MD5 signatures
+        shared_table = shared_table.ljust(self._hint_shared_table_size(), b"\0")
+
+        if not self.chapters:
+            return page_table + shared_table
+
+        # Outline hint table: where the outline objects (written together by close()) are
+        outline_start = self.offsets[self.outline_ids[0]]
+        outline_table = struct.pack(">IIII", self.outline_ids[0], adjust(outline_start),
+                                    len(self.bookmarks) + 1, self.outline_end - outline_start)
+        return page_table + shared_table + outline_table
+
+    def add_image(self, index, image):
+        """
+        Writes image number index (0-based, matching layouts) from an EncodedImage,
+        together with the page(s) it is placed on.
+        Each page is written page dictionary first, as linearized files expect.
+        """
+        placements = self.layouts[index]
+        first_linearized_page = self.linearize and not self.page_ids
+        if first_linearized_page:
+            self._start_linearized_file(index)
+
+        # A chapter's bookmark goes to the first of its pages that is actually written
+        if self.chapters:
+            chapter = self.image_chapters[index]
+            if not self.bookmarks or self.bookmarks[-1][0] != chapter:
+                self.bookmarks.append((chapter, len(self.page_ids)))
+        image_width, image_height = image.size
+        decode_parms = f" /DecodeParms {image.decode_parms}" if image.decode_parms else ""
+        image_dictionary = (f"<< /Type /XObject /Subtype /Image /Width {image_width} /Height {image_height} "
+                            f"/ColorSpace /{image.colorspace} /BitsPerComponent {image.bits} /Filter /{image.filter}"
+                            f"{decode_parms} /Length {len(image.data)} >>")
+
+        # In a linearized file a spread's image is shared by both halves - unless the first page shows it,
+        # it goes to the shared objects section
+        shared = self.linearize and len(placements) > 1 and not first_linearized_page
+        image_id = None
+        if shared:
+            image_id = self.next_shared_id
+            self.next_shared_id += 1
+
+        for number, placement in enumerate(placements):
+            if first_linearized_page and number == 0:
+                page_id, contents_id, image_id = self.first_page_ids
+            else:
+                page_id, contents_id = self._reserve(), self._reserve()
+                if image_id is None:
+                    image_id = self._reserve()
+
+            section_start = self.fp.tell()
+            box = f"[0 0 {_format_number(placement.width)} {_format_number(placement.height)}]"
+            self._write_object(
+                page_id,
+                f"<< /Type /Page /Parent {self.pages_id} 0 R /MediaBox {box} /CropBox {box} "
+                f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {contents_id} 0 R >>",
+            )
+
+            matrix = " ".join(_format_number(value) for value in placement.matrix)
+            contents = f"q {matrix} cm /Im0 Do Q".encode()
+            contents_offset = self.fp.tell()
+            self._write_object(contents_id, f"<< /Length {len(contents)} >>", contents)
+            contents_length = self.fp.tell() - contents_offset
+            object_count = 2
+            shared_indexes = []
+
+            # The image goes with the first page that shows it, other pages refer to it as a shared object
+            if image_id not in self.offsets and not shared:
+                self._write_object(image_id, image_dictionary, image.data)
+                object_count += 1
+            elif self.linearize:
+                shared_indexes.append(self._shared_object_index(image_id))
+
+            self.page_ids.append(page_id)
+            self.page_sections.append((section_start, self.fp.tell(), object_count,
+                                       contents_offset - section_start, contents_length, shared_indexes))
+
+            if first_linearized_page and number == 0:
+                # The hint stream ends the first-page section - filled in by close()
+                self.first_page_end = self.hint_offset = self.fp.tell()
+                size = self._hint_tables_size()
+                page_table_size = self._hint_page_table_size()
+                outline_table = f" /O {page_table_size + self._hint_shared_table_size()}" if self.chapters else ""
+                self.hint_data_offset = self._write_object(
+                    self.hint_id, f"<< /Length {size} /S {page_table_size}{outline_table} >>", bytes(size))
+                self.hint_length = self.fp.tell() - self.hint_offset
+
+        if shared:
+            # Kept on disk, not in memory, until close() writes the shared objects section
+            if self.spool is None:
+                self.spool = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(self.partial_path)))
+            self.spooled_images.append((image_id, image_dictionary, self.spool.tell(), len(image.data)))
+            self.spool.write(image.data)
+
+    def close(self):
+        """Writes the shared images, outline, page tree, catalog, cross-reference table and trailer"""
+        for image_id, image_dictionary, spool_offset, length in self.spooled_images:
+            self.spool.seek(spool_offset)
+            self._write_object(image_id, image_dictionary, self.spool.read(length))
+        self._close_spool()
+        if self.bookmarks:
+            self._write_outline()
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(self.pages_id, f"<< /Type /Pages /Kids [{kids}] /Count {self.page_count} >>")
+        if not self.linearize:
+            self._write_object(self.catalog_id, self._catalog())
+            self.size = self.next_id
+
+        # Ids of pages that failed to decode are listed as free objects
+        free_ids = [obj_id for obj_id in range(1, self.size) if obj_id not in self.offsets]
+        self.next_free = dict(zip([0] + free_ids, free_ids + [0]))
+
+        # A linearized file's main table covers everything below the first-page section
+        main_size = self.catalog_id if self.linearize else self.size
+        xref_offset = self.fp.tell()
+        xref_header = f"xref\n0 {main_size}\n".encode()
+        self.fp.write(xref_header)
+        self.fp.write("".join(self._xref_entry(obj_id) for obj_id in range(main_size)).encode())
+
+        if not self.linearize:
+            self.fp.write(f"trailer\n<< /Size {main_size} /Root {self.catalog_id} 0 R >>\n"
+                          f"startxref\n{xref_offset}\n%%EOF\n".encode())
+        else:
+            # Readers start from the first-page table, which points back here through /Prev
+            self.fp.write(f"trailer\n<< /Size {main_size} >>\nstartxref\n{self.first_xref_offset}\n%%EOF\n".encode())
+            file_length = self.fp.tell()
+
+            # Fill in the placeholders - same sizes, so nothing else moves
+            self.fp.seek(self.offsets[self.linearization_id])
+            self.fp.write(self._linearization_object(file_length, self.hint_offset, self.hint_length,
+                                                     self.first_page_end, self.page_count,
+                                                     xref_offset + len(xref_header) - 1))
+            self.fp.seek(self.first_xref_offset)
+            self.fp.write(self._first_page_xref(xref_offset))
+            self.fp.seek(self.hint_data_offset)
+            self.fp.write(self._hint_stream_data())
+        self.fp.close()
+
+        # Only now replace any previous PDF
+        os.replace(self.partial_path, self.output_path)
+
+    def abort(self):
+        """Closes and removes a partially written file"""
+        self._close_spool()
+        self.fp.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+    def _close_spool(self):
+        """Closes (and so deletes) the temporary file of shared images"""
+        if self.spool is not None:
+            self.spool.close()
+            self.spool = None
+
+
+def read_file(path):
+    """Reads a whole file into memory"""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def read_ahead(pages, executor, max_in_flight=IO_WORKERS, max_bytes=READ_AHEAD_BYTES):
+    """
+    Reads page files ahead of the decoders on the given executor.
+    At most max_in_flight reads (and max_bytes of file data, using the probed file sizes) are
+    outstanding at once, so slow storage keeps reading while earlier pages are being decoded.
+    Yields (page, future) in page order - future.result() returns the file's bytes.
+    """
+    window = deque()
+    buffered = 0
+    upcoming = iter(pages)
+    next_page = next(upcoming, None)
+
+    while window or next_page is not None:
+        # Top up the window - always allow one read, even if a single file is over budget
+        while next_page is not None and len(window) < max_in_flight and \
+                (not window or buffered + next_page.file_size <= max_bytes):
+            window.append((next_page, executor.submit(read_file, next_page.path)))
+            buffered += next_page.file_size
+            next_page = next(upcoming, None)
+
+        page, future = window.popleft()
+        buffered -= page.file_size
+        yield page, future
+
+
+class MemoryBudget:
+    """
+    Admits page decodes against a RAM budget (in bytes), shared by every decode thread in the process.
+    Small pages run side by side; when large pages arrive fewer of them are admitted at once,
+    so the number of decode workers can be set high without risking running out of memory.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_use = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, amount):
+        """Blocks until amount bytes fit in the budget"""
+        with self.condition:
+            # A page bigger than the whole budget still gets decoded, just on its own
+            while self.in_use and self.in_use + amount > self.limit:
+                self.condition.wait()
+            self.in_use += amount
+
+    def release(self, amount):
+        with self.condition:
+            self.in_use -= amount
+            self.condition.notify_all()
+
+
+def estimate_page_memory(page):
+    """
+    Estimates the peak memory needed to decode and re-encode one page, from its header alone:
+    the decoded image, its RGB copy, plus the file data and the encoded result.
+    """
+    try:
+        bands = Image.getmodebands(page.mode)
+    except (KeyError, ValueError):
+        bands = 4  # unusual modes (e.g. 16/32-bit) - err on the high side
+    return page.width * page.height * (bands + 3) + 2 * page.file_size
+
+
+def encode_page_within_budget(memory_budget, cost, *args):
+    """Runs encode_page, then gives its share of the memory budget back"""
+    try:
+        return encode_page(*args)
+    finally:
+        memory_budget.release(cost)
+
+
+def _jpeg_image(img, quality):
+    """Re-encodes an RGB or L image as JPEG (DCTDecode)"""
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality)
+    colorspace = "DeviceGray" if img.mode == "L" else "DeviceRGB"
+    return EncodedImage(buffer.getvalue(), img.size, colorspace, "DCTDecode", 8, None, "jpeg")
+
+
+def _png_chunks(data):
+    """Yields (type, data) for every chunk of a PNG file"""
+    position = 8  # skip the signature
+    while position + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[position:position + 8])
+        yield chunk_type, data[position + 8:position + 8 + length]
+        position += 12 + length
+
+
+def _flate_image(img, compress_level, encoder):
+    """
+    Encodes an RGB, L or 1 image losslessly as FlateDecode with PNG predictors.
+    Pillow's PNG encoder does the filtering and compression - its IDAT data is exactly what
+    a PDF Flate stream with /Predictor 15 expects.
+    """
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG", compress_level=compress_level)
+    data = b"".join(chunk for chunk_type, chunk in _png_chunks(buffer.getvalue()) if chunk_type == b"IDAT")
+    bits = 1 if img.mode == "1" else 8
+    colors = 3 if img.mode == "RGB" else 1
+    colorspace = "DeviceRGB" if img.mode == "RGB" else "DeviceGray"
+    parms = f"<< /Predictor 15 /Colors {colors} /BitsPerComponent {bits} /Columns {img.size[0]} >>"
+    return EncodedImage(data, img.size, colorspace, "FlateDecode", bits, parms, encoder)
+
+
+def _verify_jpeg(data, page):
+    """
+    Decodes a JPEG at 1/8 scale - the whole compressed stream is still read,
+    so broken or truncated data raises, at a fraction of the cost of a full decode
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft(img.mode, (max(1, page.width // 8), max(1, page.height // 8)))
+        img.load()
+
+
+def _verify_png_data(idat, width, height, colors, bits):
+    """Inflates PNG image data a piece at a time (nothing is kept) and checks it holds every row"""
+    expected = height * (1 + (width * colors * bits + 7) // 8)  # each row starts with a filter byte
+    inflater = zlib.decompressobj()
+    size = len(inflater.decompress(idat, 1024 * 1024))
+    while inflater.unconsumed_tail:
+        size += len(inflater.decompress(inflater.unconsumed_tail, 1024 * 1024))
+    size += len(inflater.flush())
+    if not inflater.eof or size < expected:
+        raise ValueError("broken PNG data stream")
+
+
+def pass_through_page(data, page):
+    """
+    Returns the page's own compressed data as an EncodedImage when the PDF can use it as it is,
+    without decoding it to pixels: baseline/progressive RGB or grayscale JPEGs, and non-interlaced
+    8-bit RGB/grayscale (or 1-bit) PNGs. Returns None otherwise.
+    The data is checked cheaply first (see _verify_jpeg and _verify_png_data) - broken data raises,
+    so the page is skipped (and quarantined) like one that fails to decode.
+    """
+    if page.format == "JPEG" and page.mode in ("RGB", "L"):
+        _verify_jpeg(data, page)
+        colorspace = "DeviceGray" if page.mode == "L" else "DeviceRGB"
+        return EncodedImage(data, (page.width, page.height), colorspace, "DCTDecode", 8, None, "jpeg-passthrough")
+
+    if page.format == "PNG" and page.mode in ("RGB", "L", "1"):
+        chunks = list(_png_chunks(data))
+        width, height, bits, color_type, _, _, interlace = struct.unpack(">IIBBBBB", chunks[0][1])
+        if interlace or (color_type, bits) not in ((0, 1), (0, 8), (2, 8)):
+            return None
+        colors = 3 if color_type == 2 else 1
+        idat = b"".join(chunk for chunk_type, chunk in chunks if chunk_type == b"IDAT")
+        _verify_png_data(idat, width, height, colors, bits)
+        parms = f"<< /Predictor 15 /Colors {colors} /BitsPerComponent {bits} /Columns {width} >>"
+        colorspace = "DeviceRGB" if colors == 3 else "DeviceGray"
+        return EncodedImage(idat, (width, height), colorspace, "FlateDecode", bits, parms, "png-passthrough")
+
+    return None
+
+
+def analyse_page(rgb):
+    """
+    Cheap statistics used to pick an encoder, taken from a nearest-neighbour sample of the page
+    (so line art keeps its exact colours). Returns (grayscale, bilevel, flat):
+    grayscale - no noticeable colour, bilevel - almost every pixel is near black or white,
+    flat - only a handful of distinct colours (flat colour or line art).
+    """
+    width, height = rgb.size
+    sample = rgb.resize((max(1, width // 4), max(1, height // 4)), Image.Resampling.NEAREST)
+    gray = sample.convert("L")
+
+    chroma = ImageChops.difference(sample, gray.convert("RGB"))
+    grayscale = max(high for _, high in chroma.getextrema()) <= GRAYSCALE_TOLERANCE
+
+    histogram = gray.histogram()
+    extremes = sum(histogram[:BILEVEL_MARGIN]) + sum(histogram[-BILEVEL_MARGIN:])
+    bilevel = grayscale and extremes >= BILEVEL_RATIO * sum(histogram)
+
+    flat = sample.getcolors(FLAT_COLOURS) is not None
+    sample.close()
+    gray.close()
+    return grayscale, bilevel, flat
+
+
+def encode_page(data, page, profile="jpeg", quality=JPEG_QUALITY):
+    """
+    Encodes one page for the PDF from its file data, choosing the encoder by profile:
+      jpeg     - decode and re-encode everything as RGB JPEG (the original behaviour)
+      fast     - least CPU: pass JPEG and PNG data straight through, re-encode anything else as JPEG
+      balanced - pass JPEGs through; 1-bit Flate for black and white pages, Flate for flat colour,
+                 JPEG (grayscale where possible) for everything else
+      small    - least output: try every encoder that applies and keep the smallest
+    Returns an EncodedImage. The decoded pixels are released before returning.
+    """
+    passthrough = pass_through_page(data, page) if profile != "jpeg" else None
+    if passthrough is not None and (profile == "fast" or (profile == "balanced" and page.format == "JPEG")):
+        return passthrough
+
+    with Image.open(io.BytesIO(data)) as img:
+        rgb = img.convert("RGB")
+    try:
+        if profile in ("jpeg", "fast"):
+            return _jpeg_image(rgb, quality)
+
+        grayscale, bilevel, flat = analyse_page(rgb)
+        compress_level = 9 if profile == "small" else 6
+        source = rgb.convert("L") if grayscale else rgb
+        try:
+            candidates = []
+            if bilevel:
+                bitmap = source.convert("1", dither=Image.Dither.NONE)
+                candidates.append(_flate_image(bitmap, compress_level, "flate-1bit"))
+                bitmap.close()
+            elif flat:
+                candidates.append(passthrough or _flate_image(source, compress_level, "flate"))
+
+            if profile == "balanced" and candidates:
+                return candidates[0]
+
+            candidates.append(_jpeg_image(source, quality))
+            if passthrough is not None:
+                candidates.append(passthrough)
+            return min(candidates, key=lambda candidate: len(candidate.data))
+        finally:
+            if source is not rgb:
+                source.close()
+    finally:
+        rgb.close()
+
+
+@contextmanager
+def memory_limit_lifted():
+    """
+    Temporarily lifts the memory limit of an isolated group worker (see _isolated_group_worker),
+    so a page that failed can be checked again without it. Does nothing in a process without a limit.
+    """
+    if resource is None:
+        yield
         return
+    soft, hard = resource.getrlimit(resource.RLIMIT_DATA)
+    resource.setrlimit(resource.RLIMIT_DATA, (hard, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_DATA, (soft, hard))
+
 
-    # Try to open the first image and convert it to RGB format
+def is_broken_page(page, encoder_profile="jpeg", jpeg_quality=JPEG_QUALITY):
+    """
+    Decodes a page that failed during a conversion again, on its own. Pages are decoded in parallel and
+    Pillow reports some allocation failures as OSError, so only a page that still fails by itself
+    (and not because it can't be read or memory ran out) is really broken.
+    Call it inside memory_limit_lifted(), a page that needs more than the worker's limit isn't broken either.
+    """
     try:
-        first = Image.open(image_paths[0]).convert("RGB")
+        encode_page(read_file(page.path), page, encoder_profile, jpeg_quality)
+    except MemoryError:
+        return False
     except Exception as e:
-        print(f"Failed to open first image: {e}")
-        return
+        return not is_read_error(e)
+    return False
+
+
+def convert_images_to_pdf(image_paths, output_path, delete_images=False, quarantine_dir=None,
+                          page_size="original", split_spreads=False, direction="rtl",
+                          io_workers=IO_WORKERS, read_ahead_bytes=READ_AHEAD_BYTES, decode_workers=DECODE_WORKERS,
+                          max_memory=None, memory_budget=None, linearize=False,
+                          encoder_profile="jpeg", jpeg_quality=JPEG_QUALITY, chapters=None):
+    """
+    Takes a list of image file paths and converts them into a single PDF file.
+    Every image header is probed first, so broken files are rejected (or moved to
+    quarantine_dir when given) before any time is spent decoding the rest of the volume.
+    page_size, split_spreads and direction control the page layout (see layout_page).
+    io_workers and read_ahead_bytes limit the page reads in flight, decode_workers the pages
+    being decoded at once - file reads overlap with decoding instead of adding to it.
+    memory_budget (a MemoryBudget, or one created from max_memory bytes) limits how many
+    pages are decoded at once by their estimated memory use.
+    linearize writes the PDF for fast web view (see PdfWriter).
+    encoder_profile and jpeg_quality choose how pages are encoded (see encode_page).
+    chapters maps each image path to the title of its chapter (e.g. its folder name) - the PDF then
+    gets a bookmark and page labels for every chapter (see PdfWriter).
+    Returns a result dict (status, page counts and bytes) for the run report.
+    """
+    result = {"status": "failed", "pages": 0, "rejected": 0, "skipped": 0,
+              "input_bytes": 0, "output_bytes": 0, "encoders": {}, "error": None}
 
-    # Process all remaining images
-    rest = []
-    for path in image_paths[1:]:  # Skip the first image (index 0)
+    # If no images provided, skip conversion
+    if not image_paths:
+        print(f"No images to convert for {output_path}")
+        result["status"] = "empty"
+        return result
+
+    # Pre-flight: read only the headers of every page. Probes run in parallel (and maybe under a memory
+    # limit), and Pillow reports some allocation failures as OSError - so a rejected page gets a second try
+    pages = probe_images(image_paths, io_workers)
+    if any(page.error and not page.read_error for page in pages):
+        with memory_limit_lifted():
+            pages = [probe_image(page.path) if page.error and not page.read_error else page for page in pages]
+    rejected = [page for page in pages if page.error is not None]
+    pages = [page for page in pages if page.error is None]
+
+    for page in rejected:
+        print(f"Rejected image {page.path}: {page.error}")
+    # Files that could not be read may be fine - they stay where they are for the next run
+    broken = [page.path for page in rejected if not page.read_error]
+    if broken and quarantine_dir:
+        quarantine_image_files(broken, quarantine_dir)
+    result["rejected"] = len(rejected)
+
+    if not pages:
+        print(f"No valid images to convert for {output_path}")
+        result["error"] = "no valid images"
+        return result
+
+    result["input_bytes"] = sum(page.file_size for page in pages)
+
+    if memory_budget is None and max_memory:
+        memory_budget = MemoryBudget(max_memory)
+
+    # Page boxes are worked out from the header sizes - normalising and splitting
+    # spreads only changes the PDF geometry, the pixels are never resampled
+    target_size = get_target_page_size(pages) if page_size == "normalize" else None
+    layouts = [layout_page(page.width, page.height, page_size, target_size, split_spreads, direction)
+               for page in pages]
+
+    # Chapters start wherever the title changes - offsets are into the pages that passed the pre-flight
+    chapter_starts = []
+    if chapters:
+        for index, page in enumerate(pages):
+            title = chapters.get(page.path, "")
+            if not chapter_starts or chapter_starts[-1][0] != title:
+                chapter_starts.append((title, index))
+
+    written = []
+    skipped = []  # pages that failed to decode
+    unreadable = []  # pages that could not be read - skipped too, but not quarantined
+    encoders = result["encoders"]  # encoder name -> {"pages": n, "bytes": n}
+
+    def write_encoded(index, page, encoded):
+        """Waits for one encoded page and writes it"""
         try:
-            # Open image, convert to RGB, and make a copy
-            img = Image.open(path).convert("RGB")
-            rest.append(img.copy())
-            img.close()  # Close the original to free memory
+            image = encoded.result()
+        except MemoryError:
+            # Out of memory is a problem with the whole run, not with this page
+            raise
         except Exception as e:
-            # If an image fails to open, skip it but continue with others
-            print(f"Skipping image {path}: {e}")
+            # If an image fails to decode, skip it but continue with others
+            print(f"Skipping image {page.path}: {e}")
+            skipped.append(page)
+            return
+        writer.add_image(index, image)
+        written.append(page.path)
+        totals = encoders.setdefault(image.encoder, {"pages": 0, "bytes": 0})
+        totals["pages"] += 1
+        totals["bytes"] += len(image.data)
 
     try:
-        # Save the first image as PDF, with all other images appended
-        first.save(output_path, save_all=True, append_images=rest)
+        # The writer lays out the page tree up front, then pages are read ahead by the
+        # I/O threads, decoded by the decode threads and written (in order) here
+        with PdfWriter(output_path, layouts, linearize, chapter_starts) as writer, \
+                ThreadPoolExecutor(max_workers=io_workers) as io_executor, \
+                ThreadPoolExecutor(max_workers=decode_workers) as decode_executor:
+            encoding = deque()
+            for index, (page, read) in enumerate(read_ahead(pages, io_executor, io_workers, read_ahead_bytes)):
+                try:
+                    data = read.result()
+                except OSError as e:
+                    print(f"Skipping image {page.path}: {e}")
+                    unreadable.append(page.path)
+                    continue
+                if memory_budget is None:
+                    encoded = decode_executor.submit(encode_page, data, page, encoder_profile, jpeg_quality)
+                else:
+                    # Wait until the decoded page fits in the memory budget
+                    cost = estimate_page_memory(page)
+                    memory_budget.acquire(cost)
+                    encoded = decode_executor.submit(encode_page_within_budget, memory_budget, cost,
+                                                     data, page, encoder_profile, jpeg_quality)
+                encoding.append((index, page, encoded))
+
+                # Only keep one page queued per decoder, so decoded pages don't pile up in memory
+                while len(encoding) > decode_workers:
+                    write_encoded(*encoding.popleft())
+
+            while encoding:
+                write_encoded(*encoding.popleft())
+
+            if not written:
+                raise ValueError("none of the images could be decoded")
+    except MemoryError:
+        # Out of memory fails the whole group (see write_encoded) - the caller reports it
+        raise
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+        print(f"Failed to save PDF {output_path}: {result['error']}")
+        return result
+    finally:
+        # Pages that failed to decode are as broken as the rejected ones - unless they decode on their own
+        if skipped and quarantine_dir:
+            with memory_limit_lifted():
+                broken = [page.path for page in skipped if is_broken_page(page, encoder_profile, jpeg_quality)]
+            if broken:
+                quarantine_image_files(broken, quarantine_dir)
+        result["skipped"] = len(skipped) + len(unreadable)
 
-        # Print success message with page count
-        print(f"Saved {output_path} ({len(image_paths)} pages)")
+    # Print success message with page count and the encoders that were used
+    print(f"Saved {output_path} ({writer.page_count} pages)")
+    if encoder_profile != "jpeg":
+        print("Encoders: " + format_encoder_totals(encoders))
+    result.update(status="ok", pages=writer.page_count, output_bytes=os.path.getsize(output_path))
 
-        # Delete source images if requested and conversion was successful
-        if delete_images:
-            delete_image_files(image_paths)
-    except Exception as e:
-        print(f"Failed to save PDF {output_path}: {e}")
+    # Delete source images if requested - only the pages that actually made it into the PDF
+    if delete_images:
+        delete_image_files(written)
+
+    return result
+
+
+def set_image_pixel_limit(max_image_pixels):
+    """
+    Sets the decompression bomb policy: images with more than max_image_pixels pixels are
+    rejected outright (Pillow normally only warns up to twice its limit). 0 disables the check.
+    """
+    if max_image_pixels is None:
         return
-    finally:
-        # Clean up memory by closing all images
-        first.close()
-        for img in rest:
-            img.close()
+    Image.MAX_IMAGE_PIXELS = max_image_pixels or None
+    warnings.simplefilter("error", Image.DecompressionBombWarning)
+
+
+def _isolated_group_worker(connection, image_paths, output_path, delete_images, quarantine_dir,
+                           memory_limit, max_image_pixels, convert_options):
+    """Child process side of convert_group_isolated - converts the group and sends back the result"""
+    # Show output as it happens, otherwise it is lost if the worker gets killed
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(line_buffering=True)
+
+    # Limit the heap (RLIMIT_DATA) rather than the address space - every I/O and decode thread reserves
+    # stack and malloc arena address space it mostly never uses, so RLIMIT_AS fails long before RAM runs out.
+    # Only the soft limit is set, the hard one is left alone so memory_limit_lifted() can raise it again
+    if memory_limit and resource is not None:
+        hard = resource.getrlimit(resource.RLIMIT_DATA)[1]
+        resource.setrlimit(resource.RLIMIT_DATA, (memory_limit, hard))
+    set_image_pixel_limit(max_image_pixels)
+
+    try:
+        result = convert_images_to_pdf(image_paths, output_path, delete_images, quarantine_dir, **convert_options)
+    except MemoryError:
+        print(f"Failed to convert {output_path}: memory limit exceeded")
+        result = {"status": "failed", "error": "memory limit exceeded"}
+    except Exception as e:
+        print(f"Failed to convert {output_path}: {e or type(e).__name__}")
+        result = {"status": "failed", "error": str(e) or type(e).__name__}
+    connection.send(result)
+    connection.close()
 
 
-def process_folder_groups(folder_groups, output_dir, delete_images=False):
+def convert_group_isolated(image_paths, output_path, delete_images=False, quarantine_dir=None,
+                           timeout=None, memory_limit=None, max_image_pixels=None, **convert_options):
+    """
+    Runs convert_images_to_pdf for one group in its own process, so a hung decoder, a decompression
+    bomb or a crash only takes down that group. The worker is killed after timeout seconds and,
+    on Unix, limited to memory_limit bytes of heap (RLIMIT_DATA, see _isolated_group_worker).
+    Returns the same result dict as convert_images_to_pdf, with status "timeout" or "crashed"
+    if the worker never reported back.
+    """
+    # spawn (rather than fork) is safe with the I/O, decode and watch threads of this process
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_isolated_group_worker,
+        args=(sender, image_paths, output_path, delete_images, quarantine_dir,
+              memory_limit, max_image_pixels, convert_options),
+        daemon=True,
+    )
+    process.start()
+    sender.close()
+
+    result = None
+    try:
+        if receiver.poll(timeout):
+            result = receiver.recv()
+        else:
+            print(f"Group timed out after {timeout}s, stopping worker")
+            process.terminate()
+            result = {"status": "timeout", "error": f"timed out after {timeout}s"}
+    except EOFError:
+        # The worker died without sending a result
+        pass
+    process.join()
+    receiver.close()
+
+    if result is None:
+        result = {"status": "crashed", "error": f"worker exited with code {process.exitcode}"}
+
+    # A killed worker can leave its half-written PDF behind
+    if os.path.exists(output_path + PARTIAL_SUFFIX):
+        os.remove(output_path + PARTIAL_SUFFIX)
+
+    return result
+
+
+def format_encoder_totals(encoders):
+    """Formats per-encoder totals like 'jpeg-passthrough: 40 pages, 12.3 MB; flate-1bit: 2 pages, 0.1 MB'"""
+    return "; ".join(f"{name}: {totals['pages']} pages, {totals['bytes'] / (1024 * 1024):.1f} MB"
+                     for name, totals in sorted(encoders.items()))
+
+
+def write_run_report(results, report_path):
+    """
+    Writes the per-group results of a run to report_path - JSON if it ends in .json, CSV otherwise.
+    """
+    fields = ["group", "status", "attempts", "duration", "pages", "rejected", "skipped",
+              "input_bytes", "output_bytes", "encoders", "output", "error"]
+    rows = [{field: result.get(field) for field in fields} for result in results]
+
+    report_dir = os.path.dirname(os.path.abspath(report_path))
+    os.makedirs(report_dir, exist_ok=True)
+    if report_path.lower().endswith(".json"):
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    else:
+        # Encoder totals go in one column, e.g. "flate-1bit=2/10240 jpeg=40/12897412" (pages/bytes)
+        for row in rows:
+            if row["encoders"]:
+                row["encoders"] = " ".join(f"{name}={totals['pages']}/{totals['bytes']}"
+                                           for name, totals in sorted(row["encoders"].items()))
+        with open(report_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    print(f"Wrote run report {report_path}")
+
+
+def process_folder_groups(folder_groups, output_dir, delete_images=False, quarantine=False,
+                          io_workers=IO_WORKERS, isolate=False, timeout=None, memory_limit=None,
+                          max_image_pixels=None, retries=GROUP_RETRIES, report_path=None, max_memory=None,
+                          **convert_options):
     """
     Generic function to process grouped folders into PDFs
     folder_groups: dict like {"group_name": [folder_paths]}
+    quarantine: move rejected images to output_dir/_quarantine/<group> instead of leaving them in place
+    io_workers: number of folders listed (and page files read) at once
+    isolate: convert each group in its own process (implied by timeout/memory_limit), see convert_group_isolated
+    max_image_pixels: reject images above this many pixels (see set_image_pixel_limit)
+    retries: how many times a failed group is tried again
+    report_path: write a JSON/CSV report with the result of every group
+    max_memory: RAM budget in bytes for decoding pages, shared by all groups of the run
+    Extra keyword options (page layout etc.) are passed on to convert_images_to_pdf
+    Returns the list of per-group results.
     """
+    isolate = isolate or bool(timeout) or bool(memory_limit)
+    if not isolate:
+        set_image_pixel_limit(max_image_pixels)
+
+    # In this process every group shares one budget, isolated workers each enforce it themselves
+    if max_memory:
+        if isolate:
+            convert_options["max_memory"] = max_memory
+        else:
+            convert_options["memory_budget"] = MemoryBudget(max_memory)
+
+    results = []
     for group_name, folders in sorted(folder_groups.items()):
         print(f"\nProcessing {group_name} ({len(folders)} folder{'s' if len(folders) > 1 else ''})")
 
+        # List the folders in parallel - on network filesystems each listing is a round trip
         all_images = []
-        for folder in sorted(folders):
-            images = get_image_files_recursive(folder)
-            all_images.extend(images)
+        chapters = {}  # image path -> name of its folder, for the bookmarks of a merged volume
+        with ThreadPoolExecutor(max_workers=io_workers) as executor:
+            for folder, images in zip(sorted(folders), executor.map(get_image_files_recursive, sorted(folders))):
+                all_images.extend(images)
+                chapters.update(dict.fromkeys(images, os.path.basename(folder)))
+        if len(folders) == 1:
+            chapters = None
 
         if not all_images:
             print(f"No images found in {group_name}")
+            results.append({"group": group_name, "status": "empty", "attempts": 0, "duration": 0.0})
             continue
 
         # Clean group name for filename
         safe_group_name = re.sub(r'[<>:"/\\|?*]', '_', group_name)
         output_pdf = os.path.join(output_dir, f"{safe_group_name}.pdf")
-        convert_images_to_pdf(all_images, output_pdf, delete_images)
+        quarantine_dir = os.path.join(output_dir, QUARANTINE_DIR_NAME, safe_group_name) if quarantine else None
+
+        started = time.monotonic()
+        for attempt in range(1, retries + 2):
+            if attempt > 1:
+                print(f"Retrying {group_name} (attempt {attempt} of {retries + 1})")
+            try:
+                if isolate:
+                    result = convert_group_isolated(all_images, output_pdf, delete_images, quarantine_dir,
+                                                    timeout, memory_limit, max_image_pixels,
+                                                    io_workers=io_workers, chapters=chapters, **convert_options)
+                else:
+                    result = convert_images_to_pdf(all_images, output_pdf, delete_images, quarantine_dir,
+                                                   io_workers=io_workers, chapters=chapters, **convert_options)
+            except MemoryError:
+                print(f"Failed to convert {group_name}: out of memory")
+                result = {"status": "failed", "error": "out of memory"}
+            except Exception as e:
+                # One broken group must not stop the rest of the run
+                print(f"Failed to convert {group_name}: {e or type(e).__name__}")
+                result = {"status": "failed", "error": str(e) or type(e).__name__}
+
+            # Rejected pages may have been quarantined - only retry with what is left
+            all_images = [path for path in all_images if os.path.exists(path)]
+            if result["status"] in ("ok", "empty") or not all_images:
+                break
+
+        result.update(group=group_name, output=output_pdf, attempts=attempt,
+                      duration=round(time.monotonic() - started, 2))
+        results.append(result)
+
+    failed = [result["group"] for result in results if result["status"] not in ("ok", "empty")]
+    print(f"\nFinished {len(results)} group{'s' if len(results) != 1 else ''}: "
+          f"{len(results) - len(failed)} ok, {len(failed)} failed")
+    if failed:
+        print(f"Failed groups: {', '.join(failed)}")
+
+    if report_path:
+        write_run_report(results, report_path)
+
+    return results
 
 
 def cleanup_after_processing(root, delete_images):
@@ -252,27 +1491,32 @@ def cleanup_after_processing(root, delete_images):
         print(f"Warning: Could not remove manga directory (may not be empty): {root}")
 
 
-def process_volumes(root, delete_images=False):
-    """Process images by grouping them into volumes"""
+def process_volumes(root, delete_images=False, **options):
+    """
+    Process images by grouping them into volumes
+    Extra keyword options are passed on to process_folder_groups
+    """
     volume_folders = get_all_retrace_folders(root)
 
     if not volume_folders:
         print("No volume folders found (folders starting with 'v' followed by numbers)")
         return
 
-    manga_name = os.path.basename(os.path.abspath(root))
-    output_dir = os.path.join(os.path.dirname(root), OUTPUT_DIR_NAME, manga_name)
+    output_dir = get_output_dir(root)
     os.makedirs(output_dir, exist_ok=True)
 
     print("Processing in VOLUMES mode (grouping by volume name)")
-    process_folder_groups(volume_folders, output_dir, delete_images)
+    process_folder_groups(volume_folders, output_dir, delete_images, **options)
 
     # Always clean up empty directories after processing
     cleanup_after_processing(root, delete_images)
 
 
-def process_chapters(root, delete_images=False):
-    """Process images by converting each folder into its own PDF"""
+def process_chapters(root, delete_images=False, **options):
+    """
+    Process images by converting each folder into its own PDF
+    Extra keyword options are passed on to process_folder_groups
+    """
     chapter_folders = get_all_chapter_folders(root)
 
     if not chapter_folders:
@@ -284,36 +1528,233 @@ def process_chapters(root, delete_images=False):
     # Convert to the same format as other grouping functions
     chapter_groups = {folder_name: [folder_path] for folder_name, folder_path in chapter_folders}
 
-    manga_name = os.path.basename(os.path.abspath(root))
-    output_dir = os.path.join(os.path.dirname(root), OUTPUT_DIR_NAME, manga_name)
+    output_dir = get_output_dir(root)
     os.makedirs(output_dir, exist_ok=True)
 
     print("Processing in CHAPTERS mode (each folder becomes a PDF)")
-    process_folder_groups(chapter_groups, output_dir, delete_images)
+    process_folder_groups(chapter_groups, output_dir, delete_images, **options)
 
     # Always clean up empty directories after processing
     cleanup_after_processing(root, delete_images)
 
 
-def process_hybrid(root, delete_images=False):
-    """Process images using hybrid grouping (volumes + individual chapters)"""
+def process_hybrid(root, delete_images=False, **options):
+    """
+    Process images using hybrid grouping (volumes + individual chapters)
+    Extra keyword options are passed on to process_folder_groups
+    """
     hybrid_groups = get_hybrid_groups(root)
 
     if not hybrid_groups:
         print("No folders found for hybrid processing")
         return
 
-    manga_name = os.path.basename(os.path.abspath(root))
-    output_dir = os.path.join(os.path.dirname(root), OUTPUT_DIR_NAME, manga_name)
+    output_dir = get_output_dir(root)
     os.makedirs(output_dir, exist_ok=True)
 
     print("Processing in HYBRID mode (grouping volumes and individual chapters)")
-    process_folder_groups(hybrid_groups, output_dir, delete_images)
+    process_folder_groups(hybrid_groups, output_dir, delete_images, **options)
 
     # Always clean up empty directories after processing
     cleanup_after_processing(root, delete_images)
 
 
+class FolderChangeTracker:
+    """
+    Remembers when each top-level folder of the manga root last changed.
+    Used as the event handler for a watchdog observer (only dispatch() is needed),
+    and fed directly by the polling fallback.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.last_change = {}  # folder path -> time.monotonic() of the latest change
+        self.last_addition = {}  # folder path -> time.monotonic() of the latest file added or written
+        self.lock = threading.Lock()
+
+    def mark(self, path, addition=True):
+        """
+        Records a change to path, attributed to the top-level folder it lives in.
+        addition=False is for files leaving the folder - what our own quarantine or delete does.
+        """
+        relative = os.path.relpath(os.path.abspath(path), self.root)
+        if relative == "." or relative.startswith(".."):
+            return
+        folder = os.path.join(self.root, relative.split(os.sep)[0])
+        now = time.monotonic()
+        with self.lock:
+            self.last_change[folder] = now
+            if addition:
+                self.last_addition[folder] = now
+
+    def dispatch(self, event):
+        """Called by watchdog from its own thread for every filesystem event"""
+        # Reading a file (including our own conversion) is not a change
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        # Removing a file also modifies its directory, so directory changes don't count as additions
+        removal = event.event_type in ("deleted", "moved") or (event.is_directory and event.event_type == "modified")
+        self.mark(event.src_path, addition=not removal)
+        # Moves report the new location too (e.g. a downloader renaming a temp folder)
+        if getattr(event, "dest_path", None):
+            self.mark(event.dest_path)
+
+    def pending(self):
+        """Returns the folders with changes that have not settled yet"""
+        with self.lock:
+            return list(self.last_change)
+
+    def pop_settled(self, settle_seconds):
+        """Returns (and forgets) the folders that have not changed for settle_seconds"""
+        now = time.monotonic()
+        with self.lock:
+            settled = [folder for folder, changed in self.last_change.items() if now - changed >= settle_seconds]
+            for folder in settled:
+                del self.last_change[folder]
+                self.last_addition.pop(folder, None)
+        return settled
+
+    def discard(self, folders, since):
+        """
+        Drops the pending changes of folders that were just converted (since = time.monotonic() when the
+        conversion started). Files removed during the run were our own quarantine or delete, but a folder
+        that had files added or written since then is kept, so it is converted again once it settles.
+        """
+        with self.lock:
+            for folder in folders:
+                if self.last_addition.get(folder, since) <= since:
+                    self.last_change.pop(folder, None)
+                    self.last_addition.pop(folder, None)
+
+
+def folder_mtimes(root):
+    """
+    Polling fallback: returns {folder_path: mtime} for every top-level folder - a single stat per folder.
+    The mtime changes when files are added to, removed from or renamed in the folder itself.
+    """
+    mtimes = {}
+    with os.scandir(root) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    mtimes[entry.path] = entry.stat().st_mtime
+            except OSError:
+                continue  # folder vanished since the listing
+    return mtimes
+
+
+def snapshot_folders(folders):
+    """
+    Polling fallback: returns {folder_path: frozenset of (file path, size, mtime)}
+    for the given top-level folders, so changes can be spotted between two polls.
+    """
+    snapshot = {}
+    for folder_path in folders:
+        files = []
+        # os.walk skips folders that are renamed or removed while it runs (e.g. a downloader
+        # moving its temp folder into place) - they show up under their new name next time
+        for dirpath, _, filenames in os.walk(folder_path):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # file vanished between listing and stat
+                files.append((path, stat.st_size, stat.st_mtime))
+        snapshot[folder_path] = frozenset(files)
+    return snapshot
+
+
+def watch_library(root, mode="hybrid", delete_images=False, settle_seconds=WATCH_SETTLE_SECONDS,
+                  poll_interval=WATCH_POLL_INTERVAL, **options):
+    """
+    Watches the manga root and converts folders as they land, until interrupted (Ctrl+C).
+    Uses inotify/FSEvents/etc. through watchdog when it is installed, otherwise polls.
+    Once a folder has stopped changing for settle_seconds, only the group(s) it belongs to
+    (using the normal grouping rules for mode) are rebuilt - the rest of the library is left alone.
+    Extra keyword options are passed on to process_folder_groups
+    """
+    root = os.path.abspath(root)
+    output_dir = get_output_dir(root)
+    tracker = FolderChangeTracker(root)
+
+    observer = None
+    previous_mtimes = previous_snapshot = None
+    if Observer is not None:
+        observer = Observer()
+        observer.schedule(tracker, root, recursive=True)
+        observer.start()
+        print(f"Watching {root} for new folders (filesystem events)")
+    else:
+        previous_mtimes = folder_mtimes(root)
+        previous_snapshot = snapshot_folders(previous_mtimes)
+        last_rescan = time.monotonic()
+        print(f"Watching {root} for new folders (polling every {poll_interval}s - install watchdog for instant events)")
+    print(f"Folders are converted once they have not changed for {settle_seconds}s. Press Ctrl+C to stop.")
+
+    try:
+        while True:
+            time.sleep(poll_interval)
+
+            if observer is None:
+                # Walking every folder each poll would mean a full rescan of a network share every few
+                # seconds - only folders that look changed, or are still settling, are walked
+                mtimes = folder_mtimes(root)
+                if time.monotonic() - last_rescan >= WATCH_RESCAN_INTERVAL:
+                    folders = set(mtimes) | set(previous_snapshot)
+                    last_rescan = time.monotonic()
+                else:
+                    folders = {folder for folder in set(mtimes) | set(previous_mtimes)
+                               if mtimes.get(folder) != previous_mtimes.get(folder)}
+                    folders.update(tracker.pending())
+                previous_mtimes = mtimes
+
+                snapshot = snapshot_folders(folder for folder in folders if folder in mtimes)
+                for folder in folders:
+                    if snapshot.get(folder) != previous_snapshot.get(folder):
+                        tracker.mark(folder)
+                    if folder in snapshot:
+                        previous_snapshot[folder] = snapshot[folder]
+                    else:
+                        previous_snapshot.pop(folder, None)
+
+            # Only folders that still exist matter - deleted ones have nothing left to convert
+            settled = [folder for folder in tracker.pop_settled(settle_seconds) if os.path.isdir(folder)]
+            if not settled:
+                continue
+
+            # Re-group the library so a new chapter is merged into its volume as usual
+            folder_groups = get_folder_groups(root, mode)
+            affected = {group_name: folders for group_name, folders in folder_groups.items()
+                        if any(folder in settled for folder in folders)}
+            if not affected:
+                continue
+
+            os.makedirs(output_dir, exist_ok=True)
+            started = time.monotonic()
+            process_folder_groups(affected, output_dir, delete_images, **options)
+
+            # Quarantining or deleting images touches the folders we just converted - ignore that,
+            # but not pages that arrived while the conversion was running
+            converted = [folder for folders in affected.values() for folder in folders]
+            if observer is None:
+                # Forget the files the run removed - added or rewritten files still differ at the next poll
+                snapshot = snapshot_folders(converted)
+                for folder in converted:
+                    kept = previous_snapshot.get(folder, frozenset())
+                    previous_snapshot[folder] = kept & snapshot.get(folder, frozenset())
+            else:
+                # Let the events of our own quarantine/delete arrive first, so they are discarded too
+                time.sleep(WATCH_EVENT_DELAY)
+                tracker.discard(converted, started)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+
 def main():
     """
     Main function that handles command-line arguments and orchestrates the conversion process.
@@ -331,6 +1772,9 @@ def main():
 
   # Use hybrid mode (mix of volumes and individual chapters)
   python3 images_to_volumes.py /path/to/manga --mode hybrid
+
+  # Keep running and convert new chapter folders as they land
+  python3 images_to_volumes.py /path/to/manga --watch
         """
     )
 
@@ -352,6 +1796,148 @@ def main():
         help='Delete source images after successful PDF conversion (also removes empty directories)'
     )
 
+    parser.add_argument(
+        '--quarantine',
+        action='store_true',
+        help=f'Move unreadable or truncated images to PDF/<manga>/{QUARANTINE_DIR_NAME}/ instead of just skipping them'
+    )
+
+    parser.add_argument(
+        '--page-size',
+        choices=['original', 'normalize'],
+        default='original',
+        help='"original" gives each page the size of its image, "normalize" fits every page into the most '
+             'common page size of the PDF (spreads get a double-width page). No pixels are resampled (default: original)'
+    )
+
+    parser.add_argument(
+        '--split-spreads',
+        action='store_true',
+        help='Show double-page spreads (images wider than they are tall) as two separate pages'
+    )
+
+    parser.add_argument(
+        '--direction',
+        choices=['rtl', 'ltr'],
+        default='rtl',
+        help='Reading direction used to order the halves of split spreads (default: rtl, as manga is read)'
+    )
+
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and convert new or changed folders once they stop changing, '
+             'rebuilding only the affected group (uses watchdog if installed, otherwise polling)'
+    )
+
+    parser.add_argument(
+        '--settle',
+        type=float,
+        default=WATCH_SETTLE_SECONDS,
+        metavar='SECONDS',
+        help=f'Watch mode: how long a folder must stay unchanged before it is converted (default: {WATCH_SETTLE_SECONDS})'
+    )
+
+    parser.add_argument(
+        '--io-workers',
+        type=int,
+        default=IO_WORKERS,
+        metavar='N',
+        help=f'Number of file reads kept in flight at once - raise it for NFS/SMB shares (default: {IO_WORKERS})'
+    )
+
+    parser.add_argument(
+        '--read-ahead-mb',
+        type=int,
+        default=READ_AHEAD_BYTES // (1024 * 1024),
+        metavar='MB',
+        help=f'Maximum page data read ahead of the decoders (default: {READ_AHEAD_BYTES // (1024 * 1024)})'
+    )
+
+    parser.add_argument(
+        '--decode-workers',
+        type=int,
+        default=DECODE_WORKERS,
+        metavar='N',
+        help=f'Number of pages decoded at once (default: {DECODE_WORKERS})'
+    )
+
+    parser.add_argument(
+        '--isolate',
+        action='store_true',
+        help='Convert each group in its own process, so a crash or hang only affects that group '
+             '(implied by --timeout and --memory-limit)'
+    )
+
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        metavar='SECONDS',
+        help='Stop a group that takes longer than this (it is then retried or reported as failed)'
+    )
+
+    parser.add_argument(
+        '--memory-limit',
+        type=int,
+        metavar='MB',
+        help='Limit on the heap memory (RLIMIT_DATA) of each group worker process - close to, but not exactly, '
+             'its RAM use, since it also counts thread stacks and memory that was never touched (Unix only)'
+    )
+
+    parser.add_argument(
+        '--max-image-pixels',
+        type=int,
+        metavar='PIXELS',
+        help='Reject images with more pixels than this as possible decompression bombs (0 = no limit)'
+    )
+
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=GROUP_RETRIES,
+        metavar='N',
+        help=f'How many times a failed group is tried again (default: {GROUP_RETRIES})'
+    )
+
+    parser.add_argument(
+        '--report',
+        metavar='FILE',
+        help='Write a report with the status, duration, page counts and sizes of every group '
+             '(JSON if FILE ends in .json, CSV otherwise)'
+    )
+
+    parser.add_argument(
+        '--max-memory',
+        type=int,
+        metavar='MB',
+        help='RAM budget for decoding pages. Pages are only decoded while their estimated size '
+             '(from the image header) fits, so --decode-workers can be raised safely'
+    )
+
+    parser.add_argument(
+        '--linearize',
+        action='store_true',
+        help='Write linearized ("fast web view") PDFs, so readers streaming them can show the first page '
+             'before the whole file has downloaded'
+    )
+
+    parser.add_argument(
+        '--encoder-profile',
+        choices=ENCODER_PROFILES,
+        default='jpeg',
+        help='How pages are encoded: "jpeg" re-encodes everything as JPEG, "fast" passes JPEG/PNG data '
+             'straight through, "balanced" also picks 1-bit/lossless encodings for line art and flat colour, '
+             '"small" tries every encoder and keeps the smallest (default: jpeg)'
+    )
+
+    parser.add_argument(
+        '--jpeg-quality',
+        type=int,
+        default=JPEG_QUALITY,
+        metavar='1-95',
+        help=f'Quality used whenever a page is re-encoded as JPEG (default: {JPEG_QUALITY})'
+    )
+
     # Parse command-line arguments
     args = parser.parse_args()
 
@@ -360,6 +1946,12 @@ def main():
         print(f"'{args.path}' is not a valid folder.")
         sys.exit(1)
 
+    # A volume is rebuilt from all of its folders whenever a chapter is added,
+    # so the images of earlier chapters have to stay around
+    if args.watch and args.delete_images and args.mode != 'chapters':
+        print("--delete-images can only be combined with --watch in chapters mode")
+        sys.exit(1)
+
     # Warn user if they are about to delete images
     if args.delete_images:
         print("WARNING: Image files and empty directories will be deleted after conversion!")
@@ -368,13 +1960,37 @@ def main():
             print("Operation cancelled")
             sys.exit(0)
 
+    options = {
+        'quarantine': args.quarantine,
+        'page_size': args.page_size,
+        'split_spreads': args.split_spreads,
+        'direction': args.direction,
+        'io_workers': max(1, args.io_workers),
+        'read_ahead_bytes': max(1, args.read_ahead_mb) * 1024 * 1024,
+        'decode_workers': max(1, args.decode_workers),
+        'isolate': args.isolate,
+        'timeout': args.timeout,
+        'memory_limit': args.memory_limit * 1024 * 1024 if args.memory_limit else None,
+        'max_image_pixels': args.max_image_pixels,
+        'retries': max(0, args.retries),
+        'report_path': args.report,
+        'max_memory': args.max_memory * 1024 * 1024 if args.max_memory else None,
+        'linearize': args.linearize,
+        'encoder_profile': args.encoder_profile,
+        'jpeg_quality': min(95, max(1, args.jpeg_quality)),
+    }
+
+    if args.watch:
+        watch_library(args.path, args.mode, args.delete_images, args.settle, **options)
+        return
+
     # Process based on selected mode
     if args.mode == 'volumes':
-        process_volumes(args.path, args.delete_images)
+        process_volumes(args.path, args.delete_images, **options)
     elif args.mode == 'chapters':
-        process_chapters(args.path, args.delete_images)
+        process_chapters(args.path, args.delete_images, **options)
     else:
-        process_hybrid(args.path, args.delete_images)
+        process_hybrid(args.path, args.delete_images, **options)
 
 
 # This runs only when the script is executed directly
@@ -0,0 +1,48 @@
+"""
+Checks the linearized PDFs written by PdfWriter with qpdf (through pikepdf), for the page layouts
+that change how the first-page section and the hint tables are built.
+"""
+import io
+
+import pytest
+from PIL import Image
+
+from manga_pdf_converter import EncodedImage, PdfWriter, layout_page
+
+pikepdf = pytest.importorskip("pikepdf")
+
+SINGLE = (100, 150)
+SPREAD = (200, 150)
+
+
+def encoded_image(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (width % 256, height % 256, 90)).save(buffer, "JPEG")
+    return EncodedImage(buffer.getvalue(), (width, height), "DeviceRGB", "DCTDecode", 8, None, "jpeg")
+
+
+@pytest.mark.parametrize("sizes, skipped, expected_pages", [
+    pytest.param([SINGLE, SINGLE, SINGLE], set(), 3, id="plain"),
+    pytest.param([SINGLE], set(), 1, id="single-page"),
+    pytest.param([SPREAD, SINGLE, SPREAD, SINGLE], set(), 6, id="spread-first"),
+    pytest.param([SINGLE, SPREAD, SPREAD, SINGLE, SPREAD], set(), 8, id="spreads"),
+    pytest.param([SINGLE, SPREAD, SINGLE, SPREAD], {0}, 5, id="skipped-first-page"),
+    pytest.param([SINGLE, SPREAD, SINGLE, SPREAD, SINGLE], {1, 3}, 3, id="skipped-spreads"),
+])
+@pytest.mark.parametrize("chapters", [False, True], ids=["no-chapters", "chapters"])
+def test_linearized_pdf_passes_qpdf_check(tmp_path, sizes, skipped, expected_pages, chapters):
+    layouts = [layout_page(width, height, split_spreads=True) for width, height in sizes]
+    chapter_starts = [("Ch1", 0), ("Ch2", len(sizes) // 2)] if chapters and len(sizes) > 1 else None
+    output_path = str(tmp_path / "volume.pdf")
+
+    with PdfWriter(output_path, layouts, linearize=True, chapters=chapter_starts) as writer:
+        for index, (width, height) in enumerate(sizes):
+            if index not in skipped:
+                writer.add_image(index, encoded_image(width, height))
+
+    report = io.StringIO()
+    with pikepdf.open(output_path) as pdf:
+        assert pdf.is_linearized
+        assert pdf.check_linearization(stream=report), report.getvalue()
+        assert report.getvalue().strip() == ""
+        assert len(pdf.pages) == expected_pages